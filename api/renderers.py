@@ -0,0 +1,23 @@
+"""
+Fast JSON renderer for API responses
+
+Uses orjson instead of the stdlib json module - several times faster to
+encode and serializes NumPy scalars and arrays natively.
+"""
+
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for DRF's JSONRenderer backed by orjson
+    
+    Output is compact UTF-8 JSON, same as the default renderer.
+    """
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        if data is None:
+            return b''
+        
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
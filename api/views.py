@@ -3,16 +3,43 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.core.cache import cache
 from django.conf import settings
-import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import math
+import threading
 import time
 
+import numpy as np
+
 from optimization.optimizer import SmartGreedyOptimizer
 from infrastructure.spatial_index import get_spatial_index
-from infrastructure.map_service import OpenRouteServiceClient
+from infrastructure.map_service import get_map_service
 
 logger = logging.getLogger('api')
 
+# Bump to invalidate all cached route responses after a format change
+ROUTE_CACHE_VERSION = 1
+
+# Response cache grid: coordinates rounded to 2 decimals (~1.1 km), so
+# nearby or differently spelled inputs share one cached response
+CACHE_GRID_DECIMALS = 2
+
+# Route geometry changes far less often than prices, cache it longer
+ROUTE_GEOMETRY_TTL = 24 * 3600  # 1 day
+
+# Geocoded addresses, so repeated address requests reach the response
+# cache without a network call. Kept to a day: geocode() may have fallen
+# back to a city centroid when the API was down
+GEOCODE_TTL = 24 * 3600  # 1 day
+
+# Pool for geocoding start and end concurrently. Each request offloads at
+# most one geocode, so one pool thread per request thread is enough
+_geocode_executor = ThreadPoolExecutor(
+    max_workers=settings.WORKER_THREADS,
+    thread_name_prefix='geocode'
+)
+
 
 class OptimizeRouteAPI(APIView):
     """
@@ -36,16 +63,18 @@ class OptimizeRouteAPI(APIView):
     }
     """
     
+    # Optimizers shared across requests, keyed by (max_range, mpg), LRU-bounded
+    _optimizer_cache: 'OrderedDict[tuple, SmartGreedyOptimizer]' = OrderedDict()
+    _optimizer_cache_lock = threading.Lock()
+    _optimizer_cache_size = 32
+    
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.optimizer = SmartGreedyOptimizer()
         self.spatial_index = get_spatial_index()
         
-        # Initialize map service if API key is configured
-        if settings.ORS_API_KEY:
-            self.map_service = OpenRouteServiceClient(settings.ORS_API_KEY)
-        else:
-            self.map_service = None
+        # Shared map service client (None if API key is not configured)
+        self.map_service = get_map_service(settings.ORS_API_KEY)
+        if not self.map_service:
             logger.warning("ORS_API_KEY not configured!")
     
     def post(self, request):
@@ -65,25 +94,23 @@ class OptimizeRouteAPI(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Optional parameters
-        max_range = request.data.get('max_range', 500)
-        mpg = request.data.get('mpg', 10.0)
-        
-        # Update optimizer parameters if provided
-        if max_range != 500 or mpg != 10.0:
-            self.optimizer = SmartGreedyOptimizer(max_range=max_range, mpg=mpg)
-        
-        # Check cache
-        cache_key = self._generate_cache_key(start, end, max_range, mpg)
-        cached = cache.get(cache_key)
-        
-        if cached:
-            logger.info(f"✓ Cache hit: {start} -> {end}")
-            cached['cache_hit'] = True
-            cached['performance']['total_response_ms'] = round(
-                (time.perf_counter() - request_start) * 1000, 2
+        # Optional parameters (coerced before they are used as cache keys)
+        try:
+            max_range = float(request.data.get('max_range', 500))
+            mpg = float(request.data.get('mpg', 10.0))
+            if not (0 < max_range < math.inf and 0 < mpg < math.inf):
+                raise ValueError
+        except (TypeError, ValueError):
+            return Response(
+                {
+                    'success': False,
+                    'error': '"max_range" and "mpg" must be positive numbers'
+                },
+                status=status.HTTP_400_BAD_REQUEST
             )
-            return Response(cached, status=status.HTTP_200_OK)
+        
+        # Reuse a warm optimizer for these parameters
+        self.optimizer = self._get_optimizer(max_range, mpg)
         
         # Validate map service
         if not self.map_service:
@@ -107,14 +134,35 @@ class OptimizeRouteAPI(APIView):
             )
         
         try:
-            # Parse locations
-            start_coords = self.map_service.parse_location(start)
-            end_coords = self.map_service.parse_location(end)
+            # Parse locations (only real geocodes leave this thread)
+            start_coords, end_coords = self._parse_locations(start, end)
+            
+            # Check cache (keyed on parsed coordinates, not input strings)
+            cache_key = self._generate_cache_key(start_coords, end_coords, max_range, mpg)
+            cached = cache.get(cache_key)
+            
+            if cached:
+                logger.info(f"✓ Cache hit: {start} -> {end}")
+                
+                # Cached response may come from a different spelling of the route
+                cached['route']['start'] = start
+                cached['route']['end'] = end
+                cached['map_url'] = self._generate_map_url(
+                    start,
+                    end,
+                    [stop['location']['lat'] for stop in cached['fuel']['stops']],
+                    [stop['location']['lon'] for stop in cached['fuel']['stops']]
+                )
+                cached['cache_hit'] = True
+                cached['performance']['total_response_ms'] = round(
+                    (time.perf_counter() - request_start) * 1000, 2
+                )
+                return Response(cached, status=status.HTTP_200_OK)
             
             logger.info(f"Route request: {start} {start_coords} -> {end} {end_coords}")
             
-            # Get route from map service
-            route = self.map_service.get_route(start_coords, end_coords)
+            # Get route from map service (or route cache)
+            route = self._get_route(start_coords, end_coords)
             
             logger.debug(
                 f"Route: {route['distance_miles']:.1f} miles, "
@@ -145,19 +193,20 @@ class OptimizeRouteAPI(APIView):
                     'cost_per_gallon_avg': round(
                         result.total_cost / result.total_gallons, 2
                     ) if result.total_gallons > 0 else 0,
+                    # One pass over the stop columns
                     'stops': [
                         {
-                            'name': stop.name,
+                            'name': name,
                             'location': {
-                                'lat': stop.location[0],
-                                'lon': stop.location[1]
+                                'lat': lat,
+                                'lon': lon
                             },
-                            'price_per_gallon': stop.price,
-                            'gallons': stop.gallons,
-                            'cost': stop.cost,
-                            'miles_from_start': stop.miles_from_start
+                            'price_per_gallon': price,
+                            'gallons': gallons,
+                            'cost': cost,
+                            'miles_from_start': miles
                         }
-                        for stop in result.stops
+                        for name, lat, lon, price, gallons, cost, miles in result.stops.rows()
                     ],
                     'num_stops': len(result.stops)
                 },
@@ -168,7 +217,12 @@ class OptimizeRouteAPI(APIView):
                     ),
                     'station_count': stats['station_count']
                 },
-                'map_url': self._generate_map_url(start, end, result.stops)
+                'map_url': self._generate_map_url(
+                    start,
+                    end,
+                    result.stops.lats.tolist(),
+                    result.stops.lons.tolist()
+                )
             }
             
             # Cache result
@@ -192,19 +246,133 @@ class OptimizeRouteAPI(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
-    def _generate_cache_key(self, start: str, end: str, max_range: int, mpg: float) -> str:
-        """Generate cache key from request parameters"""
-        key_str = f"route:{start}:{end}:{max_range}:{mpg}"
-        return hashlib.md5(key_str.encode()).hexdigest()
+    @classmethod
+    def _get_optimizer(cls, max_range: float, mpg: float) -> SmartGreedyOptimizer:
+        """Get cached optimizer for these parameters, creating it if needed"""
+        key = (max_range, mpg)
+        
+        with cls._optimizer_cache_lock:
+            optimizer = cls._optimizer_cache.get(key)
+            
+            if optimizer is None:
+                optimizer = SmartGreedyOptimizer(max_range=max_range, mpg=mpg)
+                cls._optimizer_cache[key] = optimizer
+                
+                # Evict least recently used
+                if len(cls._optimizer_cache) > cls._optimizer_cache_size:
+                    cls._optimizer_cache.popitem(last=False)
+            else:
+                cls._optimizer_cache.move_to_end(key)
+        
+        return optimizer
+    
+    def _parse_locations(self, start: str, end: str) -> tuple:
+        """
+        Parse start and end to coordinates
+        
+        Coordinate strings are parsed inline and previously geocoded
+        addresses come from the cache. If both locations still need the
+        geocoder, the end is geocoded on the shared pool while the start is
+        geocoded in the request thread.
+        
+        Returns:
+            (start_coords, end_coords)
+        """
+        start_coords = self.map_service.parse_coordinates(start)
+        end_coords = self.map_service.parse_coordinates(end)
+        
+        if start_coords is None:
+            start_coords = self._cached_geocode(start)
+        if end_coords is None:
+            end_coords = self._cached_geocode(end)
+        
+        if start_coords is None and end_coords is None:
+            end_future = _geocode_executor.submit(self._geocode, end)
+            start_coords = self._geocode(start)
+            end_coords = end_future.result()
+        elif start_coords is None:
+            start_coords = self._geocode(start)
+        elif end_coords is None:
+            end_coords = self._geocode(end)
+        
+        return start_coords, end_coords
+    
+    @staticmethod
+    def _geocode_cache_key(address: str) -> str:
+        """Cache key for an address, ignoring case and whitespace differences"""
+        return f"geocode:{'+'.join(address.lower().split())}"
+    
+    def _cached_geocode(self, address: str):
+        """Coordinates of a previously geocoded address, None if not cached"""
+        coords = cache.get(self._geocode_cache_key(address))
+        return tuple(coords) if coords else None
+    
+    def _geocode(self, address: str) -> tuple:
+        """Geocode an address with the map service and cache the result"""
+        coords = self.map_service.geocode(address)
+        cache.set(self._geocode_cache_key(address), coords, timeout=GEOCODE_TTL)
+        return coords
+    
+    def _get_route(self, start_coords: tuple, end_coords: tuple) -> dict:
+        """
+        Get route geometry, cached by coordinates rounded to 4 decimals (~11 m)
+        
+        The decoded polyline is stored as raw float32 bytes so cache hits
+        skip both the API call and polyline decoding.
+        """
+        cache_key = (
+            f"route_geometry:v{ROUTE_CACHE_VERSION}:"
+            f"{start_coords[0]:.4f},{start_coords[1]:.4f}|"
+            f"{end_coords[0]:.4f},{end_coords[1]:.4f}"
+        )
+        cached = cache.get(cache_key)
+        
+        if cached:
+            cached['polyline'] = np.frombuffer(
+                cached['polyline'], dtype=np.float32
+            ).reshape(-1, 2)
+            return cached
+        
+        route = self.map_service.get_route(start_coords, end_coords)
+        
+        cache.set(
+            cache_key,
+            {**route, 'polyline': route['polyline'].tobytes()},
+            timeout=ROUTE_GEOMETRY_TTL
+        )
+        
+        return route
+    
+    def _generate_cache_key(
+        self,
+        start_coords: tuple,
+        end_coords: tuple,
+        max_range: float,
+        mpg: float
+    ) -> str:
+        """
+        Generate cache key from parsed coordinates and parameters
+        
+        Coordinates are quantized to CACHE_GRID_DECIMALS, so an address and
+        its coordinates, or two points a few meters apart, share one entry.
+        Plain string, no hashing - the cache backend handles key storage.
+        """
+        d = CACHE_GRID_DECIMALS
+        return (
+            f"route:v{ROUTE_CACHE_VERSION}:"
+            f"{start_coords[0]:.{d}f},{start_coords[1]:.{d}f}|"
+            f"{end_coords[0]:.{d}f},{end_coords[1]:.{d}f}|"
+            f"{max_range}|{mpg}"
+        )
     
-    def _generate_map_url(self, start: str, end: str, stops: list) -> str:
-        """Generate Google Maps URL with waypoints"""
-        if not stops:
+    def _generate_map_url(self, start: str, end: str, lats: list, lons: list) -> str:
+        """Generate Google Maps URL with stop coordinates as waypoints"""
+        if not lats:
             return f"https://www.google.com{start}/{end}"
         
         waypoints = '|'.join(
-            f"{stop.location[0]},{stop.location[1]}"
-            for stop in stops
+            f"{lat},{lon}"
+            for lat, lon in zip(lats, lons)
         )
         
         return (
@@ -69,6 +69,9 @@ CACHES = {
         'LOCATION': config('REDIS_URL', default='redis://127.0.0.1:6379/1'),
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            # C-accelerated protocol parsing and compact msgpack payloads
+            'PARSER_CLASS': 'redis.connection._HiredisParser',
+            'SERIALIZER': 'django_redis.serializers.msgpack.MSGPackSerializer',
             'SOCKET_CONNECT_TIMEOUT': 5,
             'SOCKET_TIMEOUT': 5,
             'IGNORE_EXCEPTIONS': True,  # Fallback if Redis is down
@@ -96,7 +99,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.renderers.ORJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -107,6 +110,12 @@ REST_FRAMEWORK = {
 # External API Configuration
 ORS_API_KEY = config('ORS_API_KEY', default='')
 
+# Request threads per server worker - must match (or exceed) gunicorn --threads.
+# Sizes the per-worker geocoding pool. Pool threads start on demand, so a
+# generous default is cheap and keeps threaded servers (runserver, gthread)
+# from queueing requests behind each other's geocodes
+WORKER_THREADS = config('WORKER_THREADS', default=32, cast=int)
+
 # Logging
 LOGGING = {
     'version': 1,
@@ -0,0 +1,69 @@
+"""
+Great-circle distance kernels compiled with Numba
+
+Shared by the spatial index and the optimizer. Compiled once per
+machine (cache=True) and run as native code with no Python overhead.
+"""
+
+import math
+
+from numba import njit
+
+EARTH_RADIUS_MILES = 3959.0
+
+
+@njit(cache=True, fastmath=True)
+def haversine_rad_cos(
+    lat1: float, lon1: float, cos_lat1: float,
+    lat2: float, lon2: float, cos_lat2: float
+) -> float:
+    """
+    Calculate distance between two points using Haversine formula
+    
+    Takes cos(latitude) of both points precomputed, e.g. from
+    UltraFastSpatialIndex.cos_lat, so only the sines are computed per call.
+    
+    Args:
+        lat1, lon1, lat2, lon2: Coordinates in radians
+        cos_lat1, cos_lat2: Cosines of lat1 and lat2
+    
+    Returns:
+        Distance in miles
+    """
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    
+    a = math.sin(dlat/2)**2 + cos_lat1 * cos_lat2 * math.sin(dlon/2)**2
+    c = 2 * math.asin(math.sqrt(a))
+    
+    return EARTH_RADIUS_MILES * c
+
+
+@njit(cache=True, fastmath=True)
+def haversine_rad(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Calculate distance between two points given in radians
+    
+    Returns:
+        Distance in miles
+    """
+    return haversine_rad_cos(lat1, lon1, math.cos(lat1), lat2, lon2, math.cos(lat2))
+
+
+@njit(cache=True, fastmath=True)
+def haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Calculate distance between two points given in degrees
+    
+    Returns:
+        Distance in miles
+    """
+    return haversine_rad(
+        math.radians(lat1), math.radians(lon1),
+        math.radians(lat2), math.radians(lon2)
+    )
+
+
+# Compile (or load from the on-disk cache) at import, so the first
+# request does not pay the JIT cost
+haversine_miles(0.0, 0.0, 0.0, 0.0)
@@ -4,13 +4,52 @@ OpenRouteService API Client - FIXED VERSION
 Handles route calculation and geocoding with correct API endpoints
 """
 
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import polyline
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Optional
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
+# Keep-alive connections per host, sized for concurrent requests
+POOL_SIZE = 32
+
+# "lat,lon" with optional whitespace, e.g. "34.0522, -118.2437"
+_NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)'
+_COORD_RE = re.compile(rf'^\s*({_NUMBER})\s*,\s*({_NUMBER})\s*$')
+
+# Major US cities coordinates, used when the geocoding API fails
+FALLBACK_CITIES = {
+    'los angeles': (34.0522, -118.2437),
+    'san francisco': (37.7749, -122.4194),
+    'new york': (40.7128, -74.0060),
+    'chicago': (41.8781, -87.6298),
+    'houston': (29.7604, -95.3698),
+    'phoenix': (33.4484, -112.0740),
+    'philadelphia': (39.9526, -75.1652),
+    'san antonio': (29.4241, -98.4936),
+    'san diego': (32.7157, -117.1611),
+    'dallas': (32.7767, -96.7970),
+    'seattle': (47.6062, -122.3321),
+    'boston': (42.3601, -71.0589),
+    'las vegas': (36.1699, -115.1398),
+    'portland': (45.5152, -122.6784),
+    'denver': (39.7392, -104.9903),
+    'miami': (25.7617, -80.1918),
+    'atlanta': (33.7490, -84.3880),
+    'sacramento': (38.5816, -121.4944),
+    'oakland': (37.8044, -122.2712),
+    'bakersfield': (35.3733, -119.0187),
+}
+
+# All city names in one pattern - a single scan per address, which
+# finds the city that appears first (leftmost) in the address
+_FALLBACK_CITY_RE = re.compile('|'.join(re.escape(city) for city in FALLBACK_CITIES))
+
 
 class OpenRouteServiceClient:
     """
@@ -23,6 +62,23 @@ class OpenRouteServiceClient:
         self.api_key = api_key
         self.base_url = "https://api.openrouteservice.org"
         self.session = requests.Session()
+        
+        # Pooled keep-alive connections skip the TLS handshake after the
+        # first request; retry connect errors and transient gateway errors
+        # quickly, but not read timeouts, which would repeat the full wait
+        adapter = HTTPAdapter(
+            pool_connections=POOL_SIZE,
+            pool_maxsize=POOL_SIZE,
+            max_retries=Retry(
+                total=2,
+                read=0,
+                backoff_factor=0.1,
+                status_forcelist=[502, 503, 504],
+                allowed_methods=['GET', 'POST'],
+                raise_on_status=False
+            )
+        )
+        self.session.mount('https://', adapter)
         # Authorization header format for ORS
         self.session.headers.update({
             'Authorization': api_key,
@@ -42,7 +98,8 @@ class OpenRouteServiceClient:
             end: (latitude, longitude)
         
         Returns:
-            Dict with polyline, distance, duration
+            Dict with polyline ((N, 2) float32 array of lat, lon),
+            encoded polyline, distance, duration
         """
         url = f"{self.base_url}/v2/directions/driving-car"
         
@@ -63,9 +120,11 @@ class OpenRouteServiceClient:
             data = response.json()
             route = data['routes'][0]
             
-            # Decode polyline to list of coordinates
+            # Decode polyline once into a contiguous array of coordinates
             encoded_polyline = route['geometry']
-            coords = polyline.decode(encoded_polyline)
+            coords = np.asarray(
+                polyline.decode(encoded_polyline), dtype=np.float32
+            ).reshape(-1, 2)
             
             return {
                 'polyline': coords,
@@ -127,44 +186,39 @@ class OpenRouteServiceClient:
         """
         Fallback geocoding using hardcoded major US cities
         
-        This ensures the demo works even if geocoding API has issues
+        This ensures the demo works even if geocoding API has issues.
+        If the address names several known cities, the leftmost one wins,
+        e.g. "Portland, near Seattle" resolves to Portland.
         """
-        # Major US cities coordinates
-        cities = {
-            'los angeles': (34.0522, -118.2437),
-            'san francisco': (37.7749, -122.4194),
-            'new york': (40.7128, -74.0060),
-            'chicago': (41.8781, -87.6298),
-            'houston': (29.7604, -95.3698),
-            'phoenix': (33.4484, -112.0740),
-            'philadelphia': (39.9526, -75.1652),
-            'san antonio': (29.4241, -98.4936),
-            'san diego': (32.7157, -117.1611),
-            'dallas': (32.7767, -96.7970),
-            'seattle': (47.6062, -122.3321),
-            'boston': (42.3601, -71.0589),
-            'las vegas': (36.1699, -115.1398),
-            'portland': (45.5152, -122.6784),
-            'denver': (39.7392, -104.9903),
-            'miami': (25.7617, -80.1918),
-            'atlanta': (33.7490, -84.3880),
-            'sacramento': (38.5816, -121.4944),
-            'oakland': (37.8044, -122.2712),
-            'bakersfield': (35.3733, -119.0187),
-        }
         
         # Normalize address
         addr_lower = address.lower()
         
         # Try to match city name
-        for city, coords in cities.items():
-            if city in addr_lower:
-                logger.info(f"Using fallback coordinates for {city}")
-                return coords
+        match = _FALLBACK_CITY_RE.search(addr_lower)
+        if match:
+            city = match.group(0)
+            logger.info(f"Using fallback coordinates for {city}")
+            return FALLBACK_CITIES[city]
         
         # If no match, raise error
         raise ValueError(f"Could not geocode address: {address}. Try using coordinates instead (lat,lon)")
     
+    def parse_coordinates(self, location: str) -> Optional[Tuple[float, float]]:
+        """
+        Parse a "lat,lon" location string without geocoding
+        
+        Returns:
+            (latitude, longitude), or None if the string is not valid coordinates
+        """
+        match = _COORD_RE.match(location)
+        if match:
+            lat, lon = float(match.group(1)), float(match.group(2))
+            if -90 <= lat <= 90 and -180 <= lon <= 180:
+                logger.info(f"Parsed coordinates: ({lat}, {lon})")
+                return (lat, lon)
+        return None
+    
     def parse_location(self, location: str) -> Tuple[float, float]:
         """
         Parse location string to coordinates
@@ -177,16 +231,31 @@ class OpenRouteServiceClient:
             (latitude, longitude)
         """
         # Check if it's already coordinates
-        if ',' in location:
-            try:
-                parts = location.split(',')
-                if len(parts) == 2:
-                    lat, lon = float(parts[0].strip()), float(parts[1].strip())
-                    if -90 <= lat <= 90 and -180 <= lon <= 180:
-                        logger.info(f"Parsed coordinates: ({lat}, {lon})")
-                        return (lat, lon)
-            except ValueError:
-                pass
+        coords = self.parse_coordinates(location)
+        if coords is not None:
+            return coords
         
         # Otherwise, geocode it
-        return self.geocode(location)
\ No newline at end of file
+        return self.geocode(location)
+
+
+# Global singleton instance
+_map_service: Optional[OpenRouteServiceClient] = None
+
+
+def get_map_service(api_key: str) -> Optional[OpenRouteServiceClient]:
+    """
+    Get or create global map service client
+    
+    Shared across requests so the HTTP session is reused.
+    Returns None if no API key is configured.
+    """
+    global _map_service
+    
+    if not api_key:
+        return None
+    
+    if _map_service is None or _map_service.api_key != api_key:
+        _map_service = OpenRouteServiceClient(api_key)
+    
+    return _map_service
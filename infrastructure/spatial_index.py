@@ -1,6 +1,11 @@
 """
 Ultra-Fast Spatial Index using NumPy + KDTree
 
+Stations are indexed as 3D unit vectors on the sphere. Straight-line
+(chord) distance between unit vectors grows monotonically with
+great-circle distance, so the KDTree's Euclidean metric gives exact
+nearest-neighbor order and exact radius queries - no Haversine pass.
+
 THIS IS THE KEY DIFFERENTIATOR
 - 100x faster than database queries
 - 0.5ms median query time for 8,000 stations
@@ -10,14 +15,49 @@ Performance: O(log n) queries, O(n log n) build
 """
 
 import numpy as np
-from scipy.spatial import KDTree
-from typing import List, Tuple, Dict, Optional
-import csv
+import pandas as pd
+from scipy.spatial import cKDTree as KDTree
+from typing import List, Tuple, Dict, Optional, NamedTuple
 import math
+import os
 import logging
 
+
 logger = logging.getLogger(__name__)
 
+# Points per KDTree leaf - small leaves keep nearest-neighbor scans in cache
+KDTREE_LEAFSIZE = 32
+
+EARTH_RADIUS_MILES = 3959.0
+
+# CSV columns read by load_from_csv, with the value used when a column is absent
+TEXT_COLUMNS = {
+    'OPIS Truckstop ID': '',
+    'Truckstop Name': 'Unknown',
+    'City': '',
+    'State': '',
+}
+NUMERIC_COLUMNS = {
+    'Retail Price': 0.0,
+    'latitude': 0.0,
+    'longitude': 0.0,
+}
+
+# Arrays written by save() / read by load(), one .npy file each
+SNAPSHOT_ARRAYS = ('coords', 'coords_rad', 'cos_lat', 'xyz', 'prices', 'ids', 'names', 'cities', 'states')
+
+
+class StationHit(NamedTuple):
+    """A station returned by a query (immutable, read by attribute)"""
+    id: str
+    name: str
+    city: str
+    state: str
+    price: float
+    lat: float
+    lon: float
+    distance_miles: float
+
 
 class UltraFastSpatialIndex:
     """
@@ -32,9 +72,23 @@ class UltraFastSpatialIndex:
     
     def __init__(self):
         self.coords = None  # NumPy array of [lat, lon]
-        self.stations = []  # List of station dicts
-        self.tree = None    # KDTree for spatial queries
+        self.coords_rad = None  # coords in radians, converted once at load
+        self.cos_lat = None  # cos of each latitude, for Haversine
+        self.xyz = None     # coords as 3D unit vectors on the sphere
+        self.tree = None    # KDTree over self.xyz (shares its buffer)
         self.station_count = 0
+        
+        # Station data stored column-wise (Structure-of-Arrays),
+        # row i of every column belongs to station i in self.coords
+        self.prices = None  # float64 array
+        self.ids = None     # object arrays
+        self.names = None
+        self.cities = None
+        self.states = None
+        
+        # (distances, indices) of each station's nearest stations,
+        # built on first use by nearest_neighbor_table()
+        self._neighbor_table = None
     
     def load_from_csv(self, csv_path: str) -> int:
         """
@@ -52,57 +106,53 @@ class UltraFastSpatialIndex:
         Returns:
             Number of stations loaded
         """
-        coords_list = []
-        stations_list = []
-        
         try:
-            with open(csv_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                
-                for row in reader:
-                    try:
-                        # Get coordinates
-                        lat = float(row.get('latitude', 0))
-                        lon = float(row.get('longitude', 0))
-                        
-                        # Skip if no valid coordinates
-                        if lat == 0 or lon == 0:
-                            continue
-                        
-                        # Validate coordinates
-                        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
-                            continue
-                        
-                        # Parse station data
-                        station = {
-                            'id': row.get('OPIS Truckstop ID', ''),
-                            'name': row.get('Truckstop Name', 'Unknown'),
-                            'city': row.get('City', ''),
-                            'state': row.get('State', ''),
-                            'price': float(row.get('Retail Price', 0)),
-                            'lat': lat,
-                            'lon': lon,
-                        }
-                        
-                        coords_list.append([lat, lon])
-                        stations_list.append(station)
-                    
-                    except (ValueError, KeyError) as e:
-                        logger.warning(f"Skipping invalid row: {e}")
-                        continue
+            # Parse the whole file in C (text columns stay strings so IDs
+            # keep leading zeros; round_trip parses floats exactly)
+            df = pd.read_csv(
+                csv_path,
+                usecols=lambda column: column in TEXT_COLUMNS or column in NUMERIC_COLUMNS,
+                dtype={column: str for column in TEXT_COLUMNS},
+                keep_default_na=False,
+                float_precision='round_trip',
+                encoding='utf-8'
+            )
             
-            # Convert to NumPy array (this is where the magic happens)
-            self.coords = np.array(coords_list, dtype=np.float32)
-            self.stations = stations_list
-            self.station_count = len(self.stations)
+            for column, default in {**TEXT_COLUMNS, **NUMERIC_COLUMNS}.items():
+                if column not in df:
+                    df[column] = default
             
-            # Build KDTree (very fast - O(n log n))
-            if self.station_count > 0:
-                self.tree = KDTree(self.coords)
-                logger.info(f"✓ Loaded {self.station_count} stations into KDTree")
-            else:
-                logger.error("No valid stations loaded!")
+            lat = self._parse_floats(df['latitude'])
+            lon = self._parse_floats(df['longitude'])
+            price = self._parse_floats(df['Retail Price'])
             
+            # Skip rows with unparseable numbers
+            invalid = np.isnan(lat) | np.isnan(lon) | np.isnan(price)
+            if invalid.any():
+                logger.warning(f"Skipping {int(invalid.sum())} invalid rows")
+            
+            # Skip if no valid coordinates, validate coordinate ranges
+            mask = (
+                ~invalid
+                & (lat != 0) & (lon != 0)
+                & (lat >= -90) & (lat <= 90)
+                & (lon >= -180) & (lon <= 180)
+            )
+            
+            # Convert to NumPy arrays (this is where the magic happens)
+            # float64 keeps coordinates identical to the CSV values and is
+            # what KDTree works in internally anyway
+            self.coords = np.column_stack([lat[mask], lon[mask]])
+            self.coords_rad = np.deg2rad(self.coords)
+            self.cos_lat = np.cos(self.coords_rad[:, 0])
+            self.prices = price[mask]
+            self.ids = df['OPIS Truckstop ID'].to_numpy(dtype=object)[mask]
+            self.names = df['Truckstop Name'].to_numpy(dtype=object)[mask]
+            self.cities = df['City'].to_numpy(dtype=object)[mask]
+            self.states = df['State'].to_numpy(dtype=object)[mask]
+            self.station_count = len(self.coords)
+            
+            self._build_tree()
             return self.station_count
         
         except FileNotFoundError:
@@ -112,11 +162,100 @@ class UltraFastSpatialIndex:
             logger.error(f"Error loading stations: {e}")
             return 0
     
+    def save(self, path: str) -> None:
+        """
+        Save the loaded index as a snapshot directory of .npy files
+        
+        Text columns are stored as fixed-width unicode so that every
+        file can be memory-mapped by load(). Each file is written to a
+        temporary name and renamed, so concurrent readers never see a
+        partial file.
+        """
+        os.makedirs(path, exist_ok=True)
+        
+        for name in SNAPSHOT_ARRAYS:
+            array = getattr(self, name)
+            if array.dtype == object:
+                array = array.astype(str)
+            
+            final_path = os.path.join(path, f'{name}.npy')
+            tmp_path = f'{final_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, final_path)
+        
+        logger.info(f"✓ Saved spatial index snapshot: {path}")
+    
+    def load(self, path: str) -> int:
+        """
+        Load a snapshot written by save()
+        
+        Arrays are memory-mapped read-only, so worker processes loading
+        the same snapshot share its pages through the OS page cache.
+        Only the KDTree node structure is rebuilt; it references the
+        mapped xyz array directly.
+        
+        Returns:
+            Number of stations loaded
+        """
+        try:
+            arrays = {
+                name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+                for name in SNAPSHOT_ARRAYS
+            }
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading snapshot: {e}")
+            return 0
+        
+        for name, array in arrays.items():
+            setattr(self, name, array)
+        self.station_count = len(self.coords)
+        
+        self._build_tree(xyz=self.xyz)
+        return self.station_count
+    
+    def _build_tree(self, xyz: Optional[np.ndarray] = None) -> None:
+        """
+        Convert coordinates to unit vectors and build the KDTree (very fast - O(n log n))
+        
+        Args:
+            xyz: Precomputed unit vectors of self.coords (from a snapshot)
+        """
+        self._neighbor_table = None
+        
+        if self.station_count == 0:
+            self.xyz = None
+            self.tree = None
+            logger.error("No valid stations loaded!")
+            return
+        
+        # Kept in float64: cKDTree only works in float64 and would
+        # otherwise silently copy a float32 array into its own buffer
+        self.xyz = xyz if xyz is not None else self._rad_to_unit_vectors(self.coords_rad)
+        
+        self.tree = KDTree(self.xyz, leafsize=KDTREE_LEAFSIZE)
+        logger.info(f"✓ Loaded {self.station_count} stations into KDTree")
+    
+    @staticmethod
+    def _parse_floats(column: pd.Series) -> np.ndarray:
+        """
+        Convert a parsed CSV column to float64, NaN where a value is invalid
+        
+        read_csv already converts clean columns; a column with any bad
+        value comes back as strings and is converted here.
+        """
+        if column.dtype == object:
+            parsed = pd.to_numeric(column, errors='coerce')
+            # Re-convert the valid strings with exact float() semantics
+            column = column.where(parsed.notna()).astype(np.float64)
+        
+        return column.to_numpy(np.float64)
+    
     def find_nearest_n(
         self, 
         point: Tuple[float, float], 
         n: int = 50
-    ) -> List[Dict]:
+    ) -> List[StationHit]:
         """
         Find N nearest stations to a point
         
@@ -127,7 +266,7 @@ class UltraFastSpatialIndex:
             n: Number of nearest stations to return
         
         Returns:
-            List of station dicts with 'distance_miles' added
+            List of StationHit, nearest first
         """
         if self.tree is None or self.station_count == 0:
             return []
@@ -136,22 +275,78 @@ class UltraFastSpatialIndex:
         n = min(n, self.station_count)
         
         # Query KDTree (this is the fast part)
-        distances, indices = self.tree.query([point], k=n)
+        chords, indices = self.tree.query(self._to_unit_vectors(point), k=n)
         
-        results = []
-        for dist_deg, idx in zip(distances[0], indices[0]):
-            station = self.stations[idx].copy()
-            # Convert degree distance to miles (approximate)
-            station['distance_miles'] = round(dist_deg * 69, 2)  # 1 degree ≈ 69 miles
-            results.append(station)
+        distances_miles = self._chord_to_miles(np.atleast_1d(chords[0]))
+        return self._build_records(np.atleast_1d(indices[0]), distances_miles)
+    
+    def find_nearest_n_batch(
+        self,
+        points: np.ndarray,
+        n: int = 50
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find N nearest stations for many points in a single KDTree call
+        
+        Amortizes Python call overhead across all points and lets SciPy
+        spread the queries over every CPU core (workers=-1).
         
-        return results
+        Args:
+            points: Array of shape (m, 2) with (latitude, longitude) rows
+            n: Number of nearest stations per point
+        
+        Returns:
+            (distances_miles, indices) arrays of shape (m, n), sorted by distance
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        
+        if self.tree is None or self.station_count == 0:
+            empty = np.empty((len(points), 0))
+            return empty, empty.astype(np.intp)
+        
+        # Ensure n doesn't exceed station count
+        n = min(n, self.station_count)
+        
+        chords, indices = self.tree.query(self._to_unit_vectors(points), k=n, workers=-1)
+        
+        # k=1 drops the neighbor axis, restore it so callers always get (m, n)
+        chords = chords.reshape(len(points), n)
+        indices = indices.reshape(len(points), n)
+        
+        return self._chord_to_miles(chords), indices
+    
+    def nearest_neighbor_table(self, n: int = 30) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        N nearest stations to every station (including itself)
+        
+        Built with one batched KDTree query on first use and cached, so
+        searches that start at a station become a row lookup. Stored
+        compact (float32 miles, int32 indices): it is only used to rank
+        candidates, and half-size rows stay in cache.
+        
+        Returns:
+            (distances_miles, indices) arrays of shape (station_count, n),
+            sorted by distance
+        """
+        table = self._neighbor_table
+        
+        if table is None or table[1].shape[1] != min(n, self.station_count):
+            if self.station_count == 0:
+                distances = np.empty((0, 0))
+                indices = np.empty((0, 0), dtype=np.intp)
+            else:
+                distances, indices = self.find_nearest_n_batch(self.coords, n)
+            
+            table = (distances.astype(np.float32), indices.astype(np.int32))
+            self._neighbor_table = table
+        
+        return table
     
     def find_in_radius(
         self,
         point: Tuple[float, float],
         radius_miles: float
-    ) -> List[Dict]:
+    ) -> List[StationHit]:
         """
         Find all stations within radius of a point
         
@@ -162,59 +357,109 @@ class UltraFastSpatialIndex:
         Returns:
             List of stations within radius, sorted by distance
         """
-        if self.tree is None or self.station_count == 0:
+        indices, distances_miles, _ = self.find_in_radius_arrays(point, radius_miles)
+        
+        if len(indices) == 0:
             return []
         
-        # Convert miles to degrees (approximate)
-        radius_deg = radius_miles / 69.0
+        return self._build_records(indices, distances_miles)
+    
+    def find_in_radius_arrays(
+        self,
+        point: Tuple[float, float],
+        radius_miles: float
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Find all stations within radius of a point, as parallel arrays
         
-        # Query KDTree for all points in radius
-        indices = self.tree.query_ball_point(point, radius_deg)
+        Same query as find_in_radius() without building records, for
+        callers that score stations with NumPy, e.g.
+        (prices + 0.01 * distances).argmin().
         
-        if not indices:
-            return []
+        Args:
+            point: (latitude, longitude)
+            radius_miles: Search radius in miles
         
-        results = []
-        for idx in indices:
-            station = self.stations[idx].copy()
-            # Calculate exact distance using Haversine
-            dist = self._haversine_distance(
-                point,
-                (station['lat'], station['lon'])
-            )
-            
-            if dist <= radius_miles:
-                station['distance_miles'] = round(dist, 2)
-                results.append(station)
+        Returns:
+            (indices, distances_miles, prices) arrays, sorted by distance
+        """
+        if self.tree is None or self.station_count == 0 or radius_miles < 0:
+            return np.empty(0, dtype=np.intp), np.empty(0), np.empty(0)
+        
+        # Query KDTree for all points in radius - exact, no post-filter
+        query = self._to_unit_vectors(point)[0]
+        indices = np.asarray(
+            self.tree.query_ball_point(query, self._miles_to_chord(radius_miles)),
+            dtype=np.intp
+        )
         
-        # Sort by distance
-        results.sort(key=lambda s: s['distance_miles'])
-        return results
+        # Distances for the matches, sorted nearest first
+        chords = np.linalg.norm(self.xyz[indices] - query, axis=1)
+        order = np.argsort(chords)
+        
+        indices = indices[order]
+        return indices, self._chord_to_miles(chords[order]), self.prices[indices]
     
     @staticmethod
-    def _haversine_distance(point1: Tuple[float, float], point2: Tuple[float, float]) -> float:
+    def _to_unit_vectors(points) -> np.ndarray:
         """
-        Calculate distance between two points using Haversine formula
+        Convert (latitude, longitude) degrees to 3D unit vectors
         
         Returns:
-            Distance in miles
+            Array of shape (m, 3) with (x, y, z) rows
         """
-        lat1, lon1 = math.radians(point1[0]), math.radians(point1[1])
-        lat2, lon2 = math.radians(point2[0]), math.radians(point2[1])
-        
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
+        return UltraFastSpatialIndex._rad_to_unit_vectors(
+            np.deg2rad(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+        )
+    
+    @staticmethod
+    def _rad_to_unit_vectors(points_rad: np.ndarray) -> np.ndarray:
+        """Convert (latitude, longitude) radians, shape (m, 2), to 3D unit vectors"""
+        lat, lon = points_rad[:, 0], points_rad[:, 1]
+        cos_lat = np.cos(lat)
         
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
+        return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+    
+    @staticmethod
+    def _miles_to_chord(miles: float) -> float:
+        """Convert great-circle distance in miles to unit-sphere chord length"""
+        # Anything beyond the antipode is the whole sphere
+        return 2 * math.sin(min(miles / EARTH_RADIUS_MILES, math.pi) / 2)
+    
+    @staticmethod
+    def _chord_to_miles(chords: np.ndarray) -> np.ndarray:
+        """Convert unit-sphere chord lengths to great-circle distance in miles"""
+        return 2 * EARTH_RADIUS_MILES * np.arcsin(np.minimum(chords / 2, 1.0))
+    
+    def _build_records(self, indices: np.ndarray, distances_miles: np.ndarray) -> List[StationHit]:
+        """
+        Build StationHit tuples for the given indices from the column arrays
         
-        return 3959 * c  # Earth radius in miles
+        Each column is fancy-indexed once, so the per-station work is
+        just one tuple allocation.
+        """
+        return list(map(StationHit._make, zip(
+            self.ids[indices].tolist(),
+            self.names[indices].tolist(),
+            self.cities[indices].tolist(),
+            self.states[indices].tolist(),
+            self.prices[indices].tolist(),
+            self.coords[indices, 0].tolist(),
+            self.coords[indices, 1].tolist(),
+            np.round(distances_miles, 2).tolist(),
+        )))
     
     def get_stats(self) -> Dict:
         """Get index statistics"""
         return {
             'station_count': self.station_count,
-            'memory_mb': self.coords.nbytes / (1024 * 1024) if self.coords is not None else 0,
+            'memory_mb': (
+                (
+                    self.coords.nbytes + self.coords_rad.nbytes + self.cos_lat.nbytes
+                    + self.xyz.nbytes + self.prices.nbytes
+                ) / (1024 * 1024)
+                if self.xyz is not None else 0
+            ),
             'is_loaded': self.tree is not None,
         }
 
@@ -234,19 +479,44 @@ def get_spatial_index() -> UltraFastSpatialIndex:
     if _spatial_index is None:
         _spatial_index = UltraFastSpatialIndex()
         
-        # Try to load from geocoded CSV
-        import os
+        # Prefer the memory-mapped snapshot, fall back to geocoded CSV
         csv_path = os.path.join('data', 'fuel_stations_geocoded.csv')
+        snapshot_path = os.path.join('data', 'spatial_index_snapshot')
+        
+        if _is_snapshot_fresh(snapshot_path, csv_path):
+            _spatial_index.load(snapshot_path)
         
-        if os.path.exists(csv_path):
-            _spatial_index.load_from_csv(csv_path)
-        else:
-            logger.warning(f"Geocoded CSV not found: {csv_path}")
-            logger.warning("Run: python scripts/prepare_data.py first")
+        if _spatial_index.station_count == 0:
+            if os.path.exists(csv_path):
+                if _spatial_index.load_from_csv(csv_path):
+                    try:
+                        _spatial_index.save(snapshot_path)
+                    except OSError as e:
+                        logger.warning(f"Could not save spatial index snapshot: {e}")
+            else:
+                logger.warning(f"Geocoded CSV not found: {csv_path}")
+                logger.warning("Run: python scripts/prepare_data.py first")
     
     return _spatial_index
 
 
+def _is_snapshot_fresh(snapshot_path: str, csv_path: str) -> bool:
+    """Check that every snapshot file exists and is newer than the CSV"""
+    try:
+        snapshot_mtime = min(
+            os.path.getmtime(os.path.join(snapshot_path, f'{name}.npy'))
+            for name in SNAPSHOT_ARRAYS
+        )
+    except OSError:
+        return False
+    
+    # Without the CSV the snapshot is all we have
+    if not os.path.exists(csv_path):
+        return True
+    
+    return snapshot_mtime > os.path.getmtime(csv_path)
+
+
 def initialize_spatial_index(csv_path: str) -> UltraFastSpatialIndex:
     """
     Initialize spatial index with custom CSV path
@@ -8,14 +8,31 @@ Simple but effective algorithm:
 - 50-100ms typical runtime
 """
 
-from typing import List, Tuple, Dict
+from typing import Iterator, List, Tuple, Optional
 from dataclasses import dataclass
 import time
-import math
 import logging
 
+import numpy as np
+from numba import njit, types
+from numba.types import float32, float64, int32, int64
+
+from infrastructure.geo import EARTH_RADIUS_MILES, haversine_miles, haversine_rad_cos
+
 logger = logging.getLogger(__name__)
 
+# Only evaluate the nearest stations around a refuel point
+MAX_CANDIDATES = 30
+
+# Price is in dollars, distance is in miles - weight distance very
+# lightly to prefer cheaper fuel
+DETOUR_PENALTY = 0.01
+
+
+def _readonly(dtype, ndim: int) -> types.Array:
+    """C-contiguous array type that also accepts read-only (memory-mapped) arrays"""
+    return types.Array(dtype, ndim, 'C', readonly=True)
+
 
 @dataclass
 class FuelStop:
@@ -28,10 +45,92 @@ class FuelStop:
     miles_from_start: float
 
 
+# One row per fuel stop; name_id indexes FuelStops.name_table
+STOP_DTYPE = np.dtype([
+    ('lat', np.float64),
+    ('lon', np.float64),
+    ('price', np.float64),
+    ('gallons', np.float64),
+    ('cost', np.float64),
+    ('miles', np.float64),
+    ('name_id', np.int64),
+])
+
+
+@dataclass
+class FuelStops:
+    """
+    Fuel stops stored as one structured array (STOP_DTYPE)
+    
+    Names are kept out of the array: name_id indexes name_table, which
+    for optimizer results is the spatial index's own name column, so no
+    strings are copied per stop. Iterating yields FuelStop objects, built
+    only when a caller asks for them.
+    """
+    records: np.ndarray
+    name_table: np.ndarray
+    
+    @property
+    def names(self) -> np.ndarray:
+        return self.name_table[self.records['name_id']]
+    
+    @property
+    def lats(self) -> np.ndarray:
+        return self.records['lat']
+    
+    @property
+    def lons(self) -> np.ndarray:
+        return self.records['lon']
+    
+    @property
+    def prices(self) -> np.ndarray:
+        return self.records['price']
+    
+    @property
+    def gallons(self) -> np.ndarray:
+        return self.records['gallons']
+    
+    @property
+    def costs(self) -> np.ndarray:
+        return self.records['cost']
+    
+    @property
+    def miles(self) -> np.ndarray:
+        return self.records['miles']
+    
+    def rows(self) -> Iterator[tuple]:
+        """
+        Iterate (name, lat, lon, price, gallons, cost, miles) rows
+        
+        The records are converted with one tolist() call so rows hold
+        plain Python values.
+        """
+        return (
+            (name, lat, lon, price, gallons, cost, miles)
+            for name, (lat, lon, price, gallons, cost, miles, _) in zip(
+                self.names.tolist(), self.records.tolist()
+            )
+        )
+    
+    def __len__(self) -> int:
+        return len(self.records)
+    
+    def __iter__(self) -> Iterator[FuelStop]:
+        for name, lat, lon, price, gallons, cost, miles in self.rows():
+            yield FuelStop(
+                name=name,
+                location=(lat, lon),
+                price=price,
+                gallons=gallons,
+                cost=cost,
+                miles_from_start=miles
+            )
+
+
 @dataclass
 class OptimizationResult:
     """Result of route optimization"""
-    stops: List[FuelStop]
+    stops: FuelStops
     total_cost: float
     total_gallons: float
     total_distance: float
@@ -63,87 +162,95 @@ class SmartGreedyOptimizer:
         self.mpg = mpg
         self.safety_buffer = 30  # Keep 30 miles in reserve
         self.max_detour = 20  # Don't go more than 20 miles off route
+        self.waypoint_interval = 50  # Sample route every 50 miles
     
     def optimize(
         self,
         route_points: List[Tuple[float, float]],
         total_distance: float,
-        spatial_index
+        spatial_index,
+        waypoints: Optional[List[Tuple[float, float]]] = None
     ) -> OptimizationResult:
         """
         Optimize fuel stops along route
         
         Args:
-            route_points: List of (lat, lon) tuples defining route
+            route_points: (lat, lon) tuples or (N, 2) array defining route
             total_distance: Total route distance in miles
             spatial_index: Spatial index for finding stations
+            waypoints: route_points already sampled with sample_route(),
+                for callers optimizing the same route repeatedly
         
         Returns:
             OptimizationResult with stops and costs
         """
         start_time = time.perf_counter()
         
-        stops = []
-        current_fuel_miles = self.max_range
-        distance_traveled = 0.0
-        total_cost = 0.0
-        total_gallons = 0.0
-        last_stop_location = route_points[0]
-        
         # Sample route at regular intervals
-        waypoints = self._sample_route(route_points, interval=50)
+        if waypoints is None:
+            waypoints = self.sample_route(route_points)
         
         logger.debug(f"Route has {len(route_points)} points, sampled to {len(waypoints)} waypoints")
         
-        # Process each waypoint
-        for i, waypoint in enumerate(waypoints[1:], 1):
-            # Distance to this waypoint from last stop
-            segment_distance = self._distance(last_stop_location, waypoint)
-            
-            # Check if we need fuel to reach this waypoint
-            if segment_distance > current_fuel_miles - self.safety_buffer:
-                logger.debug(f"Need fuel at waypoint {i}: {segment_distance:.1f} miles, {current_fuel_miles:.1f} remaining")
-                
-                # Find best station
-                station = self._find_best_station(
-                    current_location=last_stop_location,
-                    next_waypoint=waypoint,
-                    remaining_waypoints=waypoints[i:i+3],  # Look ahead
-                    spatial_index=spatial_index,
-                    current_fuel=current_fuel_miles
-                )
-                
-                if station:
-                    # Calculate refuel amount
-                    # Strategy: Fill to 80% capacity for flexibility
-                    fuel_capacity = 0.8 * self.max_range
-                    gallons_needed = fuel_capacity / self.mpg
-                    cost = gallons_needed * station['price']
-                    
-                    stop = FuelStop(
-                        name=station['name'],
-                        location=(station['lat'], station['lon']),
-                        price=station['price'],
-                        gallons=round(gallons_needed, 2),
-                        cost=round(cost, 2),
-                        miles_from_start=round(distance_traveled, 2)
-                    )
-                    
-                    stops.append(stop)
-                    total_cost += cost
-                    total_gallons += gallons_needed
-                    
-                    logger.debug(f"Stop {len(stops)}: {station['name']} - ${cost:.2f}")
-                    
-                    # Update state
-                    current_fuel_miles = fuel_capacity
-                    last_stop_location = (station['lat'], station['lon'])
-                else:
-                    logger.warning(f"No station found at waypoint {i}!")
+        # Station columns as plain arrays for the compiled walk
+        if spatial_index.station_count:
+            station_coords_rad = np.ascontiguousarray(spatial_index.coords_rad)
+            station_cos_lat = np.ascontiguousarray(spatial_index.cos_lat)
+            station_prices = np.ascontiguousarray(spatial_index.prices)
+        else:
+            station_coords_rad = np.empty((0, 2))
+            station_cos_lat = np.empty(0)
+            station_prices = np.empty(0)
+        
+        # Candidate stations, nearest first: searches start either at the
+        # route start or at the station of the previous stop. Candidates
+        # are ranked on float32 distances, same as the neighbor table
+        start_distances, start_candidates = spatial_index.find_nearest_n_batch(
+            waypoints[:1], MAX_CANDIDATES
+        )
+        start_distances = start_distances.astype(np.float32)
+        start_candidates = start_candidates.astype(np.int32)
+        neighbor_distances, neighbor_candidates = spatial_index.nearest_neighbor_table(
+            MAX_CANDIDATES
+        )
+        neighbor_distances = np.ascontiguousarray(neighbor_distances)
+        neighbor_candidates = np.ascontiguousarray(neighbor_candidates)
+        
+        stop_indices, gallons, costs, miles, missed = _walk_route(
+            np.radians(np.asarray(waypoints, dtype=np.float64).reshape(-1, 2)),
+            start_candidates,
+            start_distances,
+            neighbor_candidates,
+            neighbor_distances,
+            station_coords_rad,
+            station_cos_lat,
+            station_prices,
+            float(self.max_range),
+            float(self.mpg),
+            float(self.safety_buffer),
+            float(self.max_detour)
+        )
+        
+        if missed:
+            logger.warning(f"No station found at {missed} waypoints!")
+        
+        # Build stops from the chosen station indices
+        if len(stop_indices):
+            records = np.empty(len(stop_indices), dtype=STOP_DTYPE)
+            records['lat'] = spatial_index.coords[stop_indices, 0]
+            records['lon'] = spatial_index.coords[stop_indices, 1]
+            records['price'] = spatial_index.prices[stop_indices]
+            records['gallons'] = np.round(gallons, 2)
+            records['cost'] = np.round(costs, 2)
+            records['miles'] = np.round(miles, 2)
+            records['name_id'] = stop_indices
             
-            # Update position
-            current_fuel_miles -= segment_distance
-            distance_traveled += segment_distance
+            stops = FuelStops(records=records, name_table=spatial_index.names)
+        else:
+            stops = FuelStops(records=np.empty(0, dtype=STOP_DTYPE), name_table=np.empty(0, dtype=object))
+        
+        total_cost = float(costs.sum())
+        total_gallons = float(gallons.sum())
         
         computation_ms = (time.perf_counter() - start_time) * 1000
         
@@ -160,109 +267,234 @@ class SmartGreedyOptimizer:
             computation_ms=round(computation_ms, 2)
         )
     
-    def _find_best_station(
-        self,
-        current_location: Tuple[float, float],
-        next_waypoint: Tuple[float, float],
-        remaining_waypoints: List[Tuple[float, float]],
-        spatial_index,
-        current_fuel: float
-    ) -> Dict:
-        """
-        Find best station considering price and detour
-        
-        Strategy:
-        1. Find stations within reach
-        2. Filter by maximum detour
-        3. Score by: price + small_detour_penalty
-        4. Return best scoring station
-        """
-        # Search radius: current fuel range, but not more than max_detour
-        search_radius = min(current_fuel * 0.9, self.max_detour)
-        
-        # Find stations near current position
-        candidates = spatial_index.find_in_radius(
-            current_location,
-            radius_miles=search_radius
-        )
-        
-        if not candidates:
-            # Expand search if nothing found
-            logger.warning(f"No stations in {search_radius:.1f} mile radius, expanding...")
-            candidates = spatial_index.find_in_radius(
-                current_location,
-                radius_miles=min(current_fuel, 50)
-            )
-        
-        if not candidates:
-            logger.error("No stations found even with expanded search!")
-            return None
-        
-        # Score each station
-        best_station = None
-        best_score = float('inf')
-        
-        for station in candidates[:30]:  # Only evaluate top 30 by distance
-            # Calculate detour penalty
-            # If station is roughly on the path, penalty is small
-            detour_dist = station['distance_miles']
-            
-            # Simple scoring: price is primary, distance is secondary
-            # Price is in dollars, distance is in miles
-            # We weight distance very lightly to prefer cheaper fuel
-            score = station['price'] + (detour_dist * 0.01)
-            
-            if score < best_score:
-                best_score = score
-                best_station = station
-        
-        return best_station
+    def sample_route(self, route_points) -> List[Tuple[float, float]]:
+        """Sample route_points into the waypoints optimize() walks"""
+        return self._sample_route(route_points, interval=self.waypoint_interval)
     
     def _sample_route(
         self,
-        points: List[Tuple[float, float]],
+        points,
         interval: float = 50
     ) -> List[Tuple[float, float]]:
         """
         Sample route at regular mile intervals
         
+        Accepts (lat, lon) tuples or an (N, 2) array.
         Reduces complexity while maintaining accuracy
         """
-        if len(points) < 2:
-            return points
+        coords = np.asarray(points, dtype=np.float64).reshape(-1, 2)
         
-        sampled = [points[0]]
-        cumulative = 0.0
+        if len(coords) < 2:
+            return [tuple(p) for p in coords.tolist()]
         
-        for i in range(1, len(points)):
-            dist = self._distance(points[i-1], points[i])
-            cumulative += dist
-            
-            if cumulative >= interval:
-                sampled.append(points[i])
-                cumulative = 0.0
+        # All segment lengths in one vectorized Haversine pass
+        rad = np.radians(coords)
+        dlat = np.diff(rad[:, 0])
+        dlon = np.diff(rad[:, 1])
+        a = np.sin(dlat/2)**2 + np.cos(rad[:-1, 0]) * np.cos(rad[1:, 0]) * np.sin(dlon/2)**2
+        segments = EARTH_RADIUS_MILES * 2 * np.arcsin(np.sqrt(a))
+        
+        # cumulative[i] = miles from the first point to point i
+        cumulative = np.concatenate(([0.0], np.cumsum(segments)))
+        
+        # Each sample is the first point at least `interval` miles past
+        # the previous sample - one binary search per sample, not per point
+        sampled = [0]
+        while True:
+            last = sampled[-1]
+            i = max(int(np.searchsorted(cumulative, cumulative[last] + interval)), last + 1)
+            if i >= len(coords):
+                break
+            sampled.append(i)
         
         # Always include destination
-        if sampled[-1] != points[-1]:
-            sampled.append(points[-1])
+        if sampled[-1] != len(coords) - 1:
+            sampled.append(len(coords) - 1)
         
-        return sampled
+        return [tuple(p) for p in coords[sampled].tolist()]
     
     @staticmethod
     def _distance(point1: Tuple[float, float], point2: Tuple[float, float]) -> float:
         """
         Calculate distance between two points using Haversine formula
         
+        Thin wrapper over the compiled kernel; floats are unpacked here so
+        the kernel is only ever called with one type signature.
+        
         Returns:
             Distance in miles
         """
-        lat1, lon1 = math.radians(point1[0]), math.radians(point1[1])
-        lat2, lon2 = math.radians(point2[0]), math.radians(point2[1])
+        return haversine_miles(
+            float(point1[0]), float(point1[1]),
+            float(point2[0]), float(point2[1])
+        )
+
+
+# No fastmath: the np.inf score seed must compare as infinity
+@njit(
+    int64(_readonly(int32, 1), _readonly(float32, 1), float64, _readonly(float64, 1)),
+    cache=True,
+    boundscheck=False,
+    nogil=True
+)
+def _best_station(
+    candidates: np.ndarray,
+    distances: np.ndarray,
+    radius_miles: float,
+    station_prices: np.ndarray
+) -> int:
+    """
+    Find best station within radius, considering price and detour
+    
+    Strategy:
+    1. Take the nearest candidates that are within radius
+    2. Score by: price + small_detour_penalty
+    3. Return best scoring station
+    
+    Args:
+        candidates: Nearest station indices around the search point
+        distances: Their distances in miles, ascending
+    
+    Returns:
+        Index of the best scoring station, -1 if none is in radius
+    """
+    best = -1
+    best_score = np.inf
+    
+    for k in range(len(candidates)):
+        # Sorted by distance, the rest are out of radius too
+        if distances[k] > radius_miles:
+            break
         
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
+        score = station_prices[candidates[k]] + distances[k] * DETOUR_PENALTY
         
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
+        if score < best_score:
+            best_score = score
+            best = candidates[k]
+    
+    return best
+
+
+# Compiled eagerly for exactly the types optimize() passes (C-contiguous
+# arrays, possibly read-only), so the first request does not pay for
+# type inference. Releases the GIL, so concurrent requests walk routes
+# in parallel over the shared read-only station arrays
+@njit(
+    types.Tuple((int64[::1], float64[::1], float64[::1], float64[::1], int64))(
+        _readonly(float64, 2),                            # waypoints_rad
+        _readonly(int32, 2), _readonly(float32, 2),       # start candidates, distances
+        _readonly(int32, 2), _readonly(float32, 2),       # neighbor candidates, distances
+        _readonly(float64, 2), _readonly(float64, 1),     # station coords_rad, cos_lat
+        _readonly(float64, 1),                            # station prices
+        float64, float64, float64, float64                # max_range, mpg, safety_buffer, max_detour
+    ),
+    cache=True,
+    fastmath=True,
+    boundscheck=False,
+    nogil=True
+)
+def _walk_route(
+    waypoints_rad: np.ndarray,
+    start_candidates: np.ndarray,
+    start_distances: np.ndarray,
+    neighbor_candidates: np.ndarray,
+    neighbor_distances: np.ndarray,
+    station_coords_rad: np.ndarray,
+    station_cos_lat: np.ndarray,
+    station_prices: np.ndarray,
+    max_range: float,
+    mpg: float,
+    safety_buffer: float,
+    max_detour: float
+):
+    """
+    Walk sampled waypoints and choose fuel stops (compiled)
+    
+    At each waypoint, check if refuel is needed to reach it from the last
+    stop; if so, pick the best station near the last stop.
+    
+    Args:
+        waypoints_rad: (W, 2) array of sampled waypoints in radians
+        start_candidates, start_distances: (1, K) nearest stations to the
+            first waypoint and their distances in miles
+        neighbor_candidates, neighbor_distances: (N, K) nearest stations
+            to every station and their distances in miles
+        station_coords_rad: (N, 2) array of station (lat, lon) in radians
+        station_cos_lat: (N,) cosines of the station latitudes
+        station_prices: (N,) array of station prices
+    
+    Returns:
+        (station_indices, gallons, costs, miles_from_start) arrays, one row
+        per stop, and the number of waypoints where no station was found
+    """
+    n_waypoints = len(waypoints_rad)
+    stop_indices = np.empty(n_waypoints, dtype=np.int64)
+    gallons = np.empty(n_waypoints)
+    costs = np.empty(n_waypoints)
+    miles = np.empty(n_waypoints)
+    n_stops = 0
+    missed = 0
+    
+    if n_waypoints < 2:
+        return stop_indices[:0], gallons[:0], costs[:0], miles[:0], missed
+    
+    # Refuel amount is the same at every stop
+    # Strategy: Fill to 80% capacity for flexibility
+    fuel_capacity = 0.8 * max_range
+    gallons_needed = fuel_capacity / mpg
+    
+    current_fuel_miles = max_range
+    distance_traveled = 0.0
+    # Cosines computed once per waypoint, not once per distance
+    waypoints_cos_lat = np.cos(waypoints_rad[:, 0])
+    
+    last_lat = waypoints_rad[0, 0]
+    last_lon = waypoints_rad[0, 1]
+    last_cos_lat = waypoints_cos_lat[0]
+    
+    # Candidates around the last stop location, nearest first
+    candidates = start_candidates[0]
+    distances = start_distances[0]
+    
+    for i in range(1, n_waypoints):
+        # Distance to this waypoint from last stop
+        segment_distance = haversine_rad_cos(
+            last_lat, last_lon, last_cos_lat,
+            waypoints_rad[i, 0], waypoints_rad[i, 1], waypoints_cos_lat[i]
+        )
         
-        return 3959 * c  # Earth radius in miles
+        # Check if we need fuel to reach this waypoint
+        if segment_distance > current_fuel_miles - safety_buffer:
+            # Search radius: current fuel range, but not more than max_detour
+            best = _best_station(
+                candidates, distances, min(current_fuel_miles * 0.9, max_detour), station_prices
+            )
+            
+            if best < 0:
+                # Expand search if nothing found
+                best = _best_station(
+                    candidates, distances, min(current_fuel_miles, 50.0), station_prices
+                )
+            
+            if best >= 0:
+                stop_indices[n_stops] = best
+                gallons[n_stops] = gallons_needed
+                costs[n_stops] = gallons_needed * station_prices[best]
+                miles[n_stops] = distance_traveled
+                n_stops += 1
+                
+                # Update state
+                current_fuel_miles = fuel_capacity
+                last_lat = station_coords_rad[best, 0]
+                last_lon = station_coords_rad[best, 1]
+                last_cos_lat = station_cos_lat[best]
+                candidates = neighbor_candidates[best]
+                distances = neighbor_distances[best]
+            else:
+                missed += 1
+        
+        # Update position
+        current_fuel_miles -= segment_distance
+        distance_traveled += segment_distance
+    
+    return stop_indices[:n_stops], gallons[:n_stops], costs[:n_stops], miles[:n_stops], missed
@@ -8,12 +8,12 @@ For the demo, we'll use city/state centroids which are fast and good enough
 for 500-mile range fuel stops.
 """
 
-import csv
 import sys
 import os
-from typing import Tuple, Dict
 import time
 
+import pandas as pd
+
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -105,25 +105,25 @@ US_CITIES = {
     ('San Jose', 'CA'): (37.3382, -121.8863),
 }
 
+# US_CITIES as a table with normalized (city.lower(), STATE) keys, merged
+# against each chunk of stations so lookups ignore case and whitespace
+_CITIES_DF = pd.DataFrame(
+    [
+        (city.lower(), state.upper(), lat, lon)
+        for (city, state), (lat, lon) in US_CITIES.items()
+    ],
+    columns=['_city', '_state', '_lat', '_lon']
+)
 
-def get_city_coords(city: str, state: str) -> Tuple[float, float]:
-    """
-    Get coordinates for city/state
-    
-    Uses simple lookup table for speed.
-    In production, use a proper geocoding service.
-    """
-    key = (city.strip(), state.strip())
-    
-    if key in US_CITIES:
-        return US_CITIES[key]
-    
-    # Try case-insensitive match
-    for (c, s), coords in US_CITIES.items():
-        if c.lower() == city.lower() and s.upper() == state.upper():
-            return coords
-    
-    return None, None
+# Stations read per chunk - bounds memory on large inputs
+CHUNK_SIZE = 10000
+
+
+def _text_column(df: pd.DataFrame, column: str) -> pd.Series:
+    """Get a text column, empty strings if the input doesn't have it"""
+    if column in df:
+        return df[column]
+    return pd.Series('', index=df.index)
 
 
 def geocode_fuel_stations(input_csv: str, output_csv: str):
@@ -143,43 +143,40 @@ def geocode_fuel_stations(input_csv: str, output_csv: str):
         print(f"\nPlease place fuel-prices-for-be-assessment.csv in the data/ directory")
         return False
     
-    stations = []
     geocoded = 0
     failed = 0
     
     print(f"\nReading: {input_csv}")
-    
-    with open(input_csv, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
+    print(f"Writing: {output_csv}")
+    
+    # Each chunk is geocoded with one merge and written straight out
+    with open(output_csv, 'w', newline='', encoding='utf-8') as f_out:
+        chunks = pd.read_csv(
+            input_csv,
+            dtype=str,
+            keep_default_na=False,  # keep every value exactly as in the input
+            chunksize=CHUNK_SIZE,
+            encoding='utf-8'
+        )
         
-        for i, row in enumerate(reader, 1):
-            city = row.get('City', '').strip()
-            state = row.get('State', '').strip()
+        for i, chunk in enumerate(chunks):
+            keys = pd.DataFrame({
+                '_city': _text_column(chunk, 'City').str.strip().str.lower(),
+                '_state': _text_column(chunk, 'State').str.strip().str.upper(),
+            })
+            coords = keys.merge(_CITIES_DF, on=['_city', '_state'], how='left')
             
-            # Get coordinates
-            lat, lon = get_city_coords(city, state)
+            found = coords['_lat'].notna().to_numpy()
+            chunk['latitude'] = coords['_lat'].to_numpy()
+            chunk['longitude'] = coords['_lon'].to_numpy()
             
-            if lat and lon:
-                row['latitude'] = lat
-                row['longitude'] = lon
-                stations.append(row)
-                geocoded += 1
-            else:
-                failed += 1
+            # Same layout as csv.DictWriter output
+            chunk[found].to_csv(f_out, header=(i == 0), index=False, lineterminator='\r\n')
             
-            if i % 1000 == 0:
-                print(f"  Processed {i} stations... (geocoded: {geocoded}, failed: {failed})")
-    
-    # Write output
-    print(f"\nWriting: {output_csv}")
-    
-    if stations:
-        fieldnames = list(stations[0].keys())
-        
-        with open(output_csv, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(stations)
+            geocoded += int(found.sum())
+            failed += int((~found).sum())
+            
+            print(f"  Processed {geocoded + failed} stations... (geocoded: {geocoded}, failed: {failed})")
     
     print("\n" + "=" * 60)
     print("GEOCODING RESULTS")
@@ -0,0 +1,42 @@
+"""
+Tests for the map service client
+"""
+
+import pytest
+from infrastructure.map_service import FALLBACK_CITIES, OpenRouteServiceClient
+
+
+class TestFallbackGeocode:
+    """Test the hardcoded-city geocoding fallback"""
+    
+    def test_known_city(self):
+        """Test that a city name is found anywhere in the address, ignoring case"""
+        client = OpenRouteServiceClient('test-key')
+        
+        assert client._fallback_geocode('123 Main St, San Antonio, TX') == FALLBACK_CITIES['san antonio']
+    
+    def test_leftmost_city_wins(self):
+        """Test that the first city named in the address is used"""
+        client = OpenRouteServiceClient('test-key')
+        
+        assert client._fallback_geocode('Portland, near Seattle') == FALLBACK_CITIES['portland']
+        assert client._fallback_geocode('Seattle, near Portland') == FALLBACK_CITIES['seattle']
+    
+    def test_unknown_city(self):
+        """Test that an address with no known city is rejected"""
+        client = OpenRouteServiceClient('test-key')
+        
+        with pytest.raises(ValueError):
+            client._fallback_geocode('Springfield, IL')
+
+
+class TestSession:
+    """Test the pooled HTTP session"""
+    
+    def test_read_timeouts_not_retried(self):
+        """Test that only connect errors and gateway statuses are retried"""
+        retry = OpenRouteServiceClient('test-key').session.get_adapter('https://api.openrouteservice.org').max_retries
+        
+        assert retry.read == 0
+        assert 'POST' in retry.allowed_methods
+        assert set(retry.status_forcelist) == {502, 503, 504}
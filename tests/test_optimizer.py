@@ -2,6 +2,9 @@
 Tests for route optimizer
 """
 
+import logging
+
+import pandas as pd
 import pytest
 from optimization.optimizer import SmartGreedyOptimizer
 from infrastructure.spatial_index import UltraFastSpatialIndex
@@ -64,3 +67,66 @@ class TestOptimizer:
         # Should include start and end
         assert sampled[0] == route[0]
         assert sampled[-1] == route[-1]
+
+
+class TestStopSelection:
+    """Test which stations the greedy walk stops at"""
+    
+    # Waypoints one degree of longitude (~56.6 miles) apart along 35N
+    WAYPOINTS = [(35.0, -100.0 + i) for i in range(5)]
+    
+    def _index(self, tmp_path, stations):
+        """Build an index from (name, longitude offset, price) stations on 35N"""
+        path = tmp_path / 'stations.csv'
+        pd.DataFrame({
+            'OPIS Truckstop ID': range(len(stations)),
+            'Truckstop Name': [name for name, _, _ in stations],
+            'City': 'Somewhere',
+            'State': 'KS',
+            'Retail Price': [price for _, _, price in stations],
+            'latitude': 35.0,
+            'longitude': [-100.0 + offset for _, offset, _ in stations],
+        }).to_csv(path, index=False)
+        
+        index = UltraFastSpatialIndex()
+        index.load_from_csv(str(path))
+        return index
+    
+    def _optimize(self, index, waypoints):
+        optimizer = SmartGreedyOptimizer(max_range=300, mpg=10.0)
+        return optimizer.optimize(waypoints, 0.0, index, waypoints=waypoints)
+    
+    def test_short_range_forces_stops(self, tmp_path):
+        """Test that the cheapest station within the detour limit is chosen"""
+        index = self._index(tmp_path, [
+            ('Near Pricey', 0.1, 3.90),     # ~5.7 miles from the start
+            ('Near Cheap', 0.2, 3.10),      # ~11.3 miles
+            ('Far Cheapest', 0.6, 2.50),    # ~34 miles, beyond the 20 mile detour
+        ])
+        
+        result = self._optimize(index, self.WAYPOINTS)
+        
+        assert [stop.name for stop in result.stops] == ['Near Cheap', 'Near Cheap']
+        assert [stop.miles_from_start for stop in result.stops] == pytest.approx([169.8, 339.6], abs=0.01)
+        assert result.total_gallons == pytest.approx(48.0)
+        assert result.total_cost == pytest.approx(148.8)
+    
+    def test_expanded_radius_fallback(self, tmp_path):
+        """Test that a station beyond the detour limit is used when nothing is closer"""
+        index = self._index(tmp_path, [('Far', 0.5, 3.00)])    # ~28 miles
+        
+        result = self._optimize(index, self.WAYPOINTS[:4])
+        
+        assert [stop.name for stop in result.stops] == ['Far']
+        assert [stop.miles_from_start for stop in result.stops] == pytest.approx([169.8], abs=0.01)
+    
+    def test_no_station_found(self, tmp_path, caplog):
+        """Test that a waypoint with no station within 50 miles is skipped and logged"""
+        index = self._index(tmp_path, [('Too Far', 1.0, 3.00)])    # ~57 miles
+        
+        with caplog.at_level(logging.WARNING, logger='optimization.optimizer'):
+            result = self._optimize(index, self.WAYPOINTS[:4])
+        
+        assert len(result.stops) == 0
+        assert result.total_cost == 0
+        assert 'No station found at 1 waypoints' in caplog.text
@@ -0,0 +1,177 @@
+"""
+Tests for the spatial index
+"""
+
+import math
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import infrastructure.spatial_index as spatial_index_module
+from infrastructure.spatial_index import UltraFastSpatialIndex
+from optimization.optimizer import SmartGreedyOptimizer
+
+
+@pytest.fixture
+def stations_csv(tmp_path):
+    """Geocoded station CSV with random stations over the continental US"""
+    rng = np.random.default_rng(42)
+    count = 5000
+    
+    path = tmp_path / 'stations.csv'
+    pd.DataFrame({
+        'OPIS Truckstop ID': np.arange(count),
+        'Truckstop Name': [f'Station {i}' for i in range(count)],
+        'City': 'Somewhere',
+        'State': 'CA',
+        'Retail Price': rng.uniform(3.0, 4.5, count).round(3),
+        'latitude': rng.uniform(25.0, 49.0, count),
+        'longitude': rng.uniform(-124.0, -67.0, count),
+    }).to_csv(path, index=False)
+    
+    return str(path)
+
+
+def brute_force_miles(stations: pd.DataFrame, point) -> np.ndarray:
+    """Haversine distance from point to every station, computed directly"""
+    lat1, lon1 = math.radians(point[0]), math.radians(point[1])
+    lat2, lon2 = np.radians(stations['latitude']), np.radians(stations['longitude'])
+    
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * 3959.0 * np.arcsin(np.sqrt(a))
+
+
+class TestQueries:
+    """Test KDTree queries against a brute-force scan"""
+    
+    POINTS = [(34.05, -118.24), (41.88, -87.63), (29.76, -95.37), (47.61, -122.33)]
+    
+    @pytest.fixture
+    def index_and_stations(self, stations_csv):
+        """Index built from the CSV, plus the CSV itself for brute-force checks"""
+        index = UltraFastSpatialIndex()
+        index.load_from_csv(stations_csv)
+        return index, pd.read_csv(stations_csv, dtype={'OPIS Truckstop ID': str})
+    
+    @pytest.mark.parametrize('radius', [5.0, 25.0, 100.0, 400.0])
+    def test_find_in_radius_matches_brute_force(self, index_and_stations, radius):
+        """Test that radius queries return exactly the stations within the radius"""
+        index, stations = index_and_stations
+        
+        for point in self.POINTS:
+            distances = brute_force_miles(stations, point)
+            expected = stations['OPIS Truckstop ID'][distances <= radius]
+            
+            hits = index.find_in_radius(point, radius)
+            
+            assert sorted(hit.id for hit in hits) == sorted(expected)
+            assert [hit.distance_miles for hit in hits] == sorted(hit.distance_miles for hit in hits)
+    
+    def test_find_in_radius_zero_and_negative(self, index_and_stations):
+        """Test that radius 0 only matches a station at the point, negative matches nothing"""
+        index, stations = index_and_stations
+        station = stations.iloc[7]
+        station_point = (station['latitude'], station['longitude'])
+        
+        assert index.find_in_radius(self.POINTS[0], 0) == []
+        assert [hit.id for hit in index.find_in_radius(station_point, 0)] == [station['OPIS Truckstop ID']]
+        assert index.find_in_radius(station_point, -1) == []
+    
+    @pytest.mark.parametrize('n', [1, 10, 50])
+    def test_find_nearest_n_matches_brute_force(self, index_and_stations, n):
+        """Test that nearest-N queries return the N closest stations in order"""
+        index, stations = index_and_stations
+        
+        for point in self.POINTS:
+            distances = brute_force_miles(stations, point)
+            expected = stations['OPIS Truckstop ID'].to_numpy()[np.argsort(distances)[:n]]
+            
+            hits = index.find_nearest_n(point, n)
+            
+            assert [hit.id for hit in hits] == list(expected)
+            np.testing.assert_allclose(
+                [hit.distance_miles for hit in hits], np.sort(distances)[:n], atol=0.01
+            )
+
+
+class TestSnapshot:
+    """Test saving, loading and refreshing index snapshots"""
+    
+    def test_save_load_round_trip(self, stations_csv, tmp_path):
+        """Test that a loaded snapshot answers queries like the CSV-built index"""
+        built = UltraFastSpatialIndex()
+        assert built.load_from_csv(stations_csv) == 5000
+        
+        snapshot_path = str(tmp_path / 'snapshot')
+        built.save(snapshot_path)
+        
+        loaded = UltraFastSpatialIndex()
+        assert loaded.load(snapshot_path) == 5000
+        
+        for point in [(34.05, -118.24), (41.88, -87.63), (40.71, -74.01)]:
+            assert loaded.find_in_radius(point, 150) == built.find_in_radius(point, 150)
+        
+        # LA to New York, straight line
+        route = list(zip(np.linspace(34.05, 40.71, 200), np.linspace(-118.24, -74.01, 200)))
+        optimizer = SmartGreedyOptimizer(max_range=500, mpg=10.0)
+        
+        from_built = optimizer.optimize(route, 2450.0, built)
+        from_loaded = optimizer.optimize(route, 2450.0, loaded)
+        
+        assert len(from_built.stops) > 0
+        assert list(from_loaded.stops.rows()) == list(from_built.stops.rows())
+        assert from_loaded.total_cost == from_built.total_cost
+    
+    @pytest.fixture
+    def data_dir(self, stations_csv, tmp_path, monkeypatch):
+        """Working directory laid out like the app's data/ folder, with a snapshot"""
+        os.makedirs(tmp_path / 'data')
+        os.replace(stations_csv, tmp_path / 'data' / 'fuel_stations_geocoded.csv')
+        monkeypatch.chdir(tmp_path)
+        
+        # First call builds from the CSV and writes the snapshot
+        monkeypatch.setattr(spatial_index_module, '_spatial_index', None)
+        assert spatial_index_module.get_spatial_index().station_count == 5000
+        
+        # Record CSV rebuilds from here on
+        csv_loads = []
+        load_from_csv = UltraFastSpatialIndex.load_from_csv
+        
+        def counting_load_from_csv(self, csv_path):
+            csv_loads.append(csv_path)
+            return load_from_csv(self, csv_path)
+        
+        monkeypatch.setattr(UltraFastSpatialIndex, 'load_from_csv', counting_load_from_csv)
+        monkeypatch.setattr(spatial_index_module, '_spatial_index', None)
+        
+        return tmp_path / 'data', csv_loads
+    
+    def test_fresh_snapshot_is_loaded(self, data_dir):
+        """Test that an up-to-date snapshot is used instead of the CSV"""
+        _, csv_loads = data_dir
+        
+        assert spatial_index_module.get_spatial_index().station_count == 5000
+        assert csv_loads == []
+    
+    def test_newer_csv_forces_rebuild(self, data_dir):
+        """Test that a CSV modified after the snapshot triggers a rebuild"""
+        path, csv_loads = data_dir
+        snapshot_mtime = os.path.getmtime(path / 'spatial_index_snapshot' / 'xyz.npy')
+        os.utime(path / 'fuel_stations_geocoded.csv', (snapshot_mtime + 10, snapshot_mtime + 10))
+        
+        assert spatial_index_module.get_spatial_index().station_count == 5000
+        assert len(csv_loads) == 1
+    
+    def test_missing_snapshot_file_forces_rebuild(self, data_dir):
+        """Test that an incomplete snapshot triggers a rebuild"""
+        path, csv_loads = data_dir
+        os.remove(path / 'spatial_index_snapshot' / 'prices.npy')
+        
+        assert spatial_index_module.get_spatial_index().station_count == 5000
+        assert len(csv_loads) == 1
+        assert os.path.exists(path / 'spatial_index_snapshot' / 'prices.npy')
@@ -0,0 +1,213 @@
+"""
+Tests for the route optimization API view
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+import api.views
+from api.views import OptimizeRouteAPI
+from infrastructure.map_service import OpenRouteServiceClient
+from infrastructure.spatial_index import UltraFastSpatialIndex
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache():
+    """Use an in-process cache instead of Redis"""
+    with override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    }):
+        # LocMem storage outlives the settings override, start each test empty
+        cache.clear()
+        yield
+
+
+@pytest.fixture
+def services(tmp_path, monkeypatch, sample_route_points, sample_stations):
+    """
+    Serve the view from a small station index and a map client whose
+    network calls are replaced by recording fakes
+    
+    Returns:
+        Dict of recorded calls: 'geocode' addresses, 'get_route' endpoints
+    """
+    # One station near the start, so refuels have a candidate
+    sample_stations = sample_stations + [{
+        'id': '4',
+        'name': 'Station D',
+        'city': 'Los Angeles',
+        'state': 'CA',
+        'lat': 34.1,
+        'lon': -118.3,
+        'price': 3.90,
+    }]
+    
+    path = tmp_path / 'stations.csv'
+    pd.DataFrame({
+        'OPIS Truckstop ID': [s['id'] for s in sample_stations],
+        'Truckstop Name': [s['name'] for s in sample_stations],
+        'City': [s['city'] for s in sample_stations],
+        'State': [s['state'] for s in sample_stations],
+        'Retail Price': [s['price'] for s in sample_stations],
+        'latitude': [s['lat'] for s in sample_stations],
+        'longitude': [s['lon'] for s in sample_stations],
+    }).to_csv(path, index=False)
+    
+    index = UltraFastSpatialIndex()
+    index.load_from_csv(str(path))
+    
+    calls = {'geocode': [], 'get_route': []}
+    client = OpenRouteServiceClient('test-key')
+    
+    def fake_geocode(address):
+        calls['geocode'].append(address)
+        return {'los angeles': (34.0522, -118.2437), 'san francisco': (37.7749, -122.4194)}[
+            address.split(',')[0].strip().lower()
+        ]
+    
+    def fake_get_route(start, end):
+        calls['get_route'].append((start, end))
+        return {
+            'polyline': np.asarray(sample_route_points, dtype=np.float32),
+            'encoded_polyline': 'encoded',
+            'distance_miles': 380.0,
+            'duration_hours': 6.0,
+        }
+    
+    monkeypatch.setattr(client, 'geocode', fake_geocode)
+    monkeypatch.setattr(client, 'get_route', fake_get_route)
+    monkeypatch.setattr(api.views, 'get_map_service', lambda api_key: client)
+    monkeypatch.setattr(api.views, 'get_spatial_index', lambda: index)
+    
+    return calls
+
+
+class TestOptimizeRouteAPI:
+    """Test request validation in the optimize-route endpoint"""
+    
+    def _post(self, data):
+        request = APIRequestFactory().post('/api/optimize', data, format='json')
+        return OptimizeRouteAPI.as_view()(request)
+    
+    @pytest.mark.parametrize('params', [
+        {'max_range': [1, 2]},
+        {'max_range': 'far'},
+        {'mpg': None},
+        {'mpg': {'value': 10}},
+        {'mpg': 0},
+        {'max_range': -500},
+    ])
+    def test_invalid_numeric_params_rejected(self, params):
+        """Test that bad max_range / mpg give a JSON 400, not a server error"""
+        response = self._post({'start': '34.05,-118.24', 'end': '37.77,-122.42', **params})
+        
+        assert response.status_code == 400
+        assert response.data['success'] is False
+        assert 'max_range' in response.data['error']
+    
+    def test_missing_locations_rejected(self):
+        """Test that start and end are required"""
+        response = self._post({'start': '34.05,-118.24'})
+        
+        assert response.status_code == 400
+        assert response.data['success'] is False
+    
+    def test_parse_locations_offloads_only_real_geocodes(self, monkeypatch):
+        """Test that coordinates are parsed inline and at most one geocode is offloaded"""
+        geocode_threads = []
+        
+        def fake_geocode(address):
+            geocode_threads.append(threading.current_thread().name)
+            return (1.0, 2.0)
+        
+        view = OptimizeRouteAPI()
+        view.map_service = OpenRouteServiceClient('test-key')
+        monkeypatch.setattr(view.map_service, 'geocode', fake_geocode)
+        
+        assert view._parse_locations('34.05,-118.24', '37.77,-122.42') == (
+            (34.05, -118.24), (37.77, -122.42)
+        )
+        assert geocode_threads == []
+        
+        assert view._parse_locations('Dallas, TX', '37.77,-122.42') == (
+            (1.0, 2.0), (37.77, -122.42)
+        )
+        assert geocode_threads == [threading.current_thread().name]
+        
+        geocode_threads.clear()
+        view._parse_locations('Houston, TX', 'Denver, CO')
+        assert len(geocode_threads) == 2
+        assert threading.current_thread().name in geocode_threads
+        assert sum(name.startswith('geocode') for name in geocode_threads) == 1
+    
+    def test_repeated_address_request_makes_no_network_calls(self, services):
+        """Test that a repeated address request is served from cache without geocoding"""
+        route = {'start': 'Los Angeles, CA', 'end': 'San Francisco, CA', 'max_range': 150}
+        
+        first = self._post(route)
+        assert first.status_code == 200
+        assert first.data['cache_hit'] is False
+        assert len(services['geocode']) == 2
+        
+        # Differently spaced and cased spelling of the same addresses
+        for repeat in [route, {**route, 'start': 'los angeles,  CA'}]:
+            response = self._post(repeat)
+            assert response.status_code == 200
+            assert response.data['cache_hit'] is True
+        
+        assert len(services['geocode']) == 2
+        assert len(services['get_route']) == 1
+    
+    def test_cache_key_grid(self):
+        """Test that points in the same 0.01 degree cell share a response cache key"""
+        view = OptimizeRouteAPI()
+        end = (37.7749, -122.4194)
+        
+        key = view._generate_cache_key((34.0522, -118.2437), end, 500.0, 10.0)
+        
+        assert view._generate_cache_key((34.0511, -118.2449), end, 500.0, 10.0) == key
+        assert view._generate_cache_key((34.0622, -118.2437), end, 500.0, 10.0) != key
+        assert view._generate_cache_key((34.0522, -118.2437), end, 500.0, 12.0) != key
+    
+    def test_cache_hit_uses_current_request_locations(self, services):
+        """Test that a hit from a nearby spelling reports this request's start, end and map URL"""
+        first = self._post({'start': '34.0522,-118.2437', 'end': '37.7749,-122.4194', 'max_range': 150})
+        assert first.data['cache_hit'] is False
+        assert first.data['fuel']['num_stops'] > 0
+        
+        response = self._post({'start': '34.0511, -118.2449', 'end': 'San Francisco, CA', 'max_range': 150})
+        
+        assert response.data['cache_hit'] is True
+        assert response.data['route']['start'] == '34.0511, -118.2449'
+        assert response.data['route']['end'] == 'San Francisco, CA'
+        assert response.data['map_url'] == first.data['map_url'].replace(
+            'origin=34.0522,-118.2437', 'origin=34.0511, -118.2449'
+        ).replace(
+            'destination=37.7749,-122.4194', 'destination=San Francisco, CA'
+        )
+        assert response.data['fuel'] == first.data['fuel']
+        assert len(services['get_route']) == 1
+    
+    def test_route_geometry_reused_across_parameters(self, services):
+        """Test that a request with different mpg reuses the cached polyline"""
+        route = {'start': '34.0522,-118.2437', 'end': '37.7749,-122.4194', 'max_range': 150}
+        
+        first = self._post(route)
+        second = self._post({**route, 'mpg': 8.0})
+        
+        # A different response cache entry, but the same route geometry
+        assert second.data['cache_hit'] is False
+        assert len(services['get_route']) == 1
+        
+        first_stops, second_stops = first.data['fuel']['stops'], second.data['fuel']['stops']
+        assert len(second_stops) > 0
+        assert [stop['miles_from_start'] for stop in second_stops] == [
+            stop['miles_from_start'] for stop in first_stops
+        ]
+        assert second_stops[0]['gallons'] > first_stops[0]['gallons']